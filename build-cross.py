@@ -8,19 +8,74 @@ import os
 import subprocess
 import sys
 import shutil
+import contextlib
+import functools
 import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from types import MappingProxyType
 
 # Build configuration
 PROJECT_DIR = Path(__file__).parent.resolve()
 TARGET_DIR = PROJECT_DIR / "target"
+LOG_DIR = TARGET_DIR / "build-cross-logs"
 OUTPUT_DIR = Path("/mnt/c/code")  # Always output to Windows drive
 
+# Environment at startup; per-target environments are derived from this so
+# later changes to os.environ can't leak between targets
+PRISTINE_ENV = MappingProxyType(dict(os.environ))
+
 # Cross-compilation toolchain paths
 LLVM_MINGW = Path("/root/toolchains/llvm-mingw/bin")
 
+
+def get_cgroup_cpu_limit() -> int | None:
+    """Get the CPU limit imposed by a cgroup quota, if any."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"; a fractional
+        # quota (e.g. 2.5 CPUs) rounds up to the next whole CPU
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            return max(1, -(-int(quota) // int(period)))
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: quota is -1 when unlimited
+        quota = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+        period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+        if quota > 0 and period > 0:
+            return max(1, -(-quota // period))
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def get_usable_cpu_count() -> int:
+    """Get the number of CPUs this process may actually use.
+
+    Respects affinity masks (taskset, cpusets) and container CPU quotas,
+    which multiprocessing.cpu_count() ignores.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        count = len(os.sched_getaffinity(0))
+    else:
+        count = multiprocessing.cpu_count()
+    limit = get_cgroup_cpu_limit()
+    if limit is not None:
+        count = min(count, limit)
+    return max(1, count)
+
+
 # Get CPU count for parallel builds
-CPU_COUNT = multiprocessing.cpu_count()
+CPU_COUNT = get_usable_cpu_count()
+
+# Rough peak memory of a single rustc/LTO job, used to cap parallelism
+DEFAULT_MEM_PER_JOB_GB = 1.5
+
+# Compiler cache shared between all targets and runs (None if not installed)
+SCCACHE = shutil.which("sccache")
+SCCACHE_DIR = Path.home() / ".cache" / "sccache"
 
 TARGETS = {
     "x64": {
@@ -40,13 +95,27 @@ TARGETS = {
 }
 
 
-def get_env_for_target(target_name: str) -> dict:
-    """Get environment variables for cross-compilation."""
+@functools.lru_cache(maxsize=None)
+def get_env_for_target(
+    target_name: str, use_sccache: bool = False
+) -> MappingProxyType:
+    """Get environment variables for cross-compilation.
+
+    The result is cached and read-only; copy it before adding variables.
+
+    Args:
+        target_name: The target architecture name (x64, arm64)
+        use_sccache: Wrap rustc and the C compiler with sccache
+    """
     target = TARGETS[target_name]
     triple = target["triple"]
     env_triple = triple.replace("-", "_")
 
-    env = os.environ.copy()
+    env = dict(PRISTINE_ENV)
+
+    # Separate target dir per architecture so concurrent builds don't block
+    # on cargo's lock over the shared host build directory
+    env["CARGO_TARGET_DIR"] = str(get_target_dir(target_name))
 
     # Add llvm-mingw to PATH if needed
     if target["use_llvm_mingw"]:
@@ -56,6 +125,13 @@ def get_env_for_target(target_name: str) -> dict:
     env[f"CC_{env_triple}"] = target["cc"]
     env[f"AR_{env_triple}"] = target["ar"]
 
+    # Route rustc and C compiles through sccache so identical invocations
+    # hit the cache across targets and across runs
+    if use_sccache and SCCACHE:
+        env["RUSTC_WRAPPER"] = SCCACHE
+        env[f"CC_{env_triple}"] = f"{SCCACHE} {target['cc']}"
+        env.setdefault("SCCACHE_DIR", str(SCCACHE_DIR))
+
     # Set linker via cargo env var
     env[f"CARGO_TARGET_{env_triple.upper()}_LINKER"] = target["linker"]
 
@@ -63,27 +139,93 @@ def get_env_for_target(target_name: str) -> dict:
     if "gnullvm" in triple:
         env[f"CARGO_TARGET_{env_triple.upper()}_RUSTFLAGS"] = "-C target-feature=+crt-static"
 
-    return env
+    return MappingProxyType(env)
+
+
+class TargetOutput:
+    """Write-only stream that copies output to a log file and the terminal.
+
+    Each complete line is echoed to the terminal with a prefix in a single
+    write, so lines from concurrent target builds stay intact.
+    """
+
+    def __init__(self, prefix: str, log, terminal):
+        self.prefix = prefix
+        self.log = log
+        self.terminal = terminal
+        self.pending = ""
+
+    def write(self, text: str) -> int:
+        self.log.write(text)
+        *lines, self.pending = (self.pending + text).split("\n")
+        if lines:
+            self.terminal.write(
+                "".join(f"{self.prefix}{line}\n" for line in lines)
+            )
+            self.terminal.flush()
+        return len(text)
+
+    def flush(self):
+        self.log.flush()
+        self.terminal.flush()
+
+    def close(self):
+        """Echo a trailing line that never got its newline."""
+        if self.pending:
+            self.terminal.write(f"{self.prefix}{self.pending}\n")
+            self.pending = ""
+        self.flush()
 
 
 def run_command(
     cmd: list, env: dict = None, cwd: Path = None, dry_run: bool = False
 ) -> bool:
-    """Run a command and return success status."""
+    """Run a command and return success status.
+
+    When sys.stdout has been redirected (e.g. by a parallel build worker),
+    the command's stdout and stderr are streamed line by line into it so
+    they can be logged or prefixed. Otherwise the command inherits the
+    terminal and keeps its progress bars and colours.
+    """
     print(f"\n>>> Running: {' '.join(cmd)}")
     if dry_run:
         return True
-    try:
-        subprocess.run(
+    if sys.stdout is sys.__stdout__:
+        sys.stdout.flush()
+        returncode = subprocess.run(
+            cmd, env=env or os.environ, cwd=cwd or PROJECT_DIR
+        ).returncode
+    else:
+        proc = subprocess.Popen(
             cmd,
             env=env or os.environ,
             cwd=cwd or PROJECT_DIR,
-            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+            bufsize=1,
         )
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error: Command failed with exit code {e.returncode}")
+        with proc.stdout:
+            for line in proc.stdout:
+                sys.stdout.write(line)
+        returncode = proc.wait()
+    if returncode != 0:
+        print(f"Error: Command failed with exit code {returncode}")
         return False
+    return True
+
+
+@functools.lru_cache(maxsize=None)
+def find_tool(tool: str) -> str | None:
+    """Locate a tool on PATH, caching the result for this session."""
+    return shutil.which(tool)
+
+
+@functools.lru_cache(maxsize=None)
+def llvm_mingw_has(tool: str) -> bool:
+    """Check whether a tool exists in the LLVM-MinGW toolchain."""
+    return (LLVM_MINGW / tool).exists()
 
 
 def check_prerequisites(target_names: list[str], dry_run: bool = False) -> bool:
@@ -95,7 +237,7 @@ def check_prerequisites(target_names: list[str], dry_run: bool = False) -> bool:
     missing = False
 
     for tool in ("cargo", "rustup"):
-        if shutil.which(tool) is None:
+        if find_tool(tool) is None:
             print(f"Error: {tool} not found")
             missing = True
 
@@ -106,10 +248,10 @@ def check_prerequisites(target_names: list[str], dry_run: bool = False) -> bool:
             "x86_64-w64-mingw32-windres",
         )
         for tool in x64_tools:
-            if shutil.which(tool) is None:
+            if find_tool(tool) is None:
                 print(f"Error: {tool} not found")
                 missing = True
-        if any(shutil.which(tool) is None for tool in x64_tools):
+        if any(find_tool(tool) is None for tool in x64_tools):
             print(
                 "Install with: apt install gcc-mingw-w64-x86-64 "
                 "binutils-mingw-w64-x86-64"
@@ -122,10 +264,10 @@ def check_prerequisites(target_names: list[str], dry_run: bool = False) -> bool:
             "aarch64-w64-mingw32-windres",
         )
         for tool in arm64_tools:
-            if not (LLVM_MINGW / tool).exists():
+            if not llvm_mingw_has(tool):
                 print(f"Error: {tool} not found in {LLVM_MINGW}")
                 missing = True
-        if any(not (LLVM_MINGW / tool).exists() for tool in arm64_tools):
+        if not all(llvm_mingw_has(tool) for tool in arm64_tools):
             print("Install the ARM64 LLVM-MinGW toolchain before building ARM64")
 
     if not missing:
@@ -133,12 +275,31 @@ def check_prerequisites(target_names: list[str], dry_run: bool = False) -> bool:
     return not missing
 
 
+def get_installed_targets() -> set[str]:
+    """Get the Rust targets already installed via rustup."""
+    try:
+        result = subprocess.run(
+            ["rustup", "target", "list", "--installed"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return set()
+    return set(result.stdout.split())
+
+
 def ensure_targets(target_names: list[str], dry_run: bool = False) -> bool:
     """Ensure only the requested Rust targets are installed."""
     print("\nEnsuring Rust targets are installed...")
 
+    installed = set() if dry_run else get_installed_targets()
+
     for name in target_names:
         target = TARGETS[name]
+        if target["triple"] in installed:
+            print(f"  {target['triple']} already installed")
+            continue
         cmd = ["rustup", "target", "add", target["triple"]]
         if not run_command(cmd, dry_run=dry_run):
             print(f"Failed to add target {target['triple']}")
@@ -147,11 +308,16 @@ def ensure_targets(target_names: list[str], dry_run: bool = False) -> bool:
     return True
 
 
+def get_target_dir(target_name: str) -> Path:
+    """Get the cargo target directory used for a specific target."""
+    return TARGET_DIR / target_name
+
+
 def get_build_output_path(target_name: str) -> Path:
     """Get the path to the built executable in the target directory."""
     target = TARGETS[target_name]
     triple = target["triple"]
-    return TARGET_DIR / triple / "release" / "htop-win.exe"
+    return get_target_dir(target_name) / triple / "release" / "htop-win.exe"
 
 
 def get_final_output_path(target_name: str) -> Path:
@@ -168,6 +334,18 @@ def copy_to_output(target_name: str) -> Path | None:
         print(f"Error: Built executable not found at {build_path}")
         return None
 
+    # Skip the slow copy to the Windows drive if the output is current.
+    # copy2 preserves mtime; compare in ms since NTFS only keeps 100ns.
+    if final_path.exists():
+        build_stat = build_path.stat()
+        final_stat = final_path.stat()
+        if (
+            final_stat.st_size == build_stat.st_size
+            and final_stat.st_mtime_ns // 1_000_000 >= build_stat.st_mtime_ns // 1_000_000
+        ):
+            print(f"\n>>> {final_path} is up-to-date")
+            return final_path
+
     # Ensure output directory exists
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -179,13 +357,21 @@ def copy_to_output(target_name: str) -> Path | None:
 
 
 def build_target(
-    target_name: str, jobs: int = None, dry_run: bool = False
+    target_name: str,
+    jobs: int = None,
+    dry_run: bool = False,
+    use_sccache: bool = False,
+    mem_per_job: float = DEFAULT_MEM_PER_JOB_GB,
+    mem_budget_gb: float | None = None,
 ) -> bool:
     """Build for a specific target.
 
     Args:
         target_name: The target architecture name (x64, arm64)
         jobs: Number of parallel jobs (defaults to CPU count)
+        use_sccache: Wrap compiler invocations with sccache
+        mem_per_job: Estimated GB per job; 0 disables the memory cap
+        mem_budget_gb: GB this build may use (defaults to available memory)
     """
     target = TARGETS[target_name]
     triple = target["triple"]
@@ -193,10 +379,23 @@ def build_target(
 
     print(f"\n{'='*60}")
     print(f"Building for {target_name} ({triple})")
+
+    # Cap jobs so parallel rustc/linker processes fit in memory
+    if mem_budget_gb is None:
+        mem_budget_gb = get_available_memory_gb()
+    if mem_per_job > 0 and mem_budget_gb > 0:
+        mem_cap = max(1, int(mem_budget_gb / mem_per_job))
+        if mem_cap < num_jobs:
+            print(
+                f"Capping jobs {num_jobs} -> {mem_cap} "
+                f"({mem_budget_gb:.1f} GB available, {mem_per_job:g} GB per job)"
+            )
+            num_jobs = mem_cap
+
     print(f"Using {num_jobs} parallel jobs")
     print(f"{'='*60}")
 
-    env = get_env_for_target(target_name)
+    env = dict(get_env_for_target(target_name, use_sccache))
     env["CARGO_BUILD_JOBS"] = str(num_jobs)
 
     cmd = ["cargo", "build", "--release", "--target", triple, "-j", str(num_jobs)]
@@ -204,7 +403,39 @@ def build_target(
     return run_command(cmd, env=env, cwd=PROJECT_DIR, dry_run=dry_run)
 
 
-def check_target(target_name: str, dry_run: bool = False) -> bool:
+def build_target_logged(
+    target_name: str,
+    jobs: int,
+    log_path: Path | None,
+    dry_run: bool = False,
+    use_sccache: bool = False,
+    mem_per_job: float = DEFAULT_MEM_PER_JOB_GB,
+    mem_budget_gb: float | None = None,
+) -> bool:
+    """Build a target, saving its output to log_path (discarded if None).
+
+    Used as the worker for parallel builds. Output is also echoed to the
+    terminal with a [target] prefix so concurrent builds stay readable.
+    """
+    with open(log_path or os.devnull, "w") as log:
+        output = TargetOutput(f"[{target_name}] ", log, sys.stdout)
+        try:
+            with contextlib.redirect_stdout(output):
+                return build_target(
+                    target_name,
+                    jobs,
+                    dry_run=dry_run,
+                    use_sccache=use_sccache,
+                    mem_per_job=mem_per_job,
+                    mem_budget_gb=mem_budget_gb,
+                )
+        finally:
+            output.close()
+
+
+def check_target(
+    target_name: str, dry_run: bool = False, use_sccache: bool = False
+) -> bool:
     """Check (compile without linking) for a specific target."""
     target = TARGETS[target_name]
     triple = target["triple"]
@@ -213,18 +444,18 @@ def check_target(target_name: str, dry_run: bool = False) -> bool:
     print(f"Checking {target_name} ({triple})")
     print(f"{'='*60}")
 
-    env = get_env_for_target(target_name)
+    env = dict(get_env_for_target(target_name, use_sccache))
     cmd = ["cargo", "check", "--target", triple]
 
     return run_command(cmd, env=env, cwd=PROJECT_DIR, dry_run=dry_run)
 
 
-def get_system_memory_gb() -> float:
-    """Get total system memory in GB."""
+def read_meminfo_gb(key: str) -> float:
+    """Read a field from /proc/meminfo in GB (0 if unavailable)."""
     try:
         with open("/proc/meminfo") as f:
             for line in f:
-                if line.startswith("MemTotal:"):
+                if line.startswith(f"{key}:"):
                     kb = int(line.split()[1])
                     return kb / (1024 * 1024)
     except:
@@ -232,6 +463,16 @@ def get_system_memory_gb() -> float:
     return 0
 
 
+def get_system_memory_gb() -> float:
+    """Get total system memory in GB."""
+    return read_meminfo_gb("MemTotal")
+
+
+def get_available_memory_gb() -> float:
+    """Get memory available for new processes in GB."""
+    return read_meminfo_gb("MemAvailable")
+
+
 def main():
     """Main entry point."""
     import argparse
@@ -258,25 +499,45 @@ def main():
         default=None,
         help=f"Number of parallel jobs (default: {CPU_COUNT} - all CPUs)"
     )
+    parser.add_argument(
+        "--mem-per-job",
+        type=float,
+        default=DEFAULT_MEM_PER_JOB_GB,
+        metavar="GB",
+        help=(
+            "Estimated memory per job, used to cap parallel jobs to available "
+            f"RAM (default: {DEFAULT_MEM_PER_JOB_GB}, 0 disables the cap)"
+        ),
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Print selected target commands without executing them",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not wrap compiler invocations with sccache",
+    )
 
     args = parser.parse_args()
     jobs = args.jobs
+    use_sccache = SCCACHE is not None and not args.no_cache
     target_names = list(TARGETS) if args.action == "build-all" else [args.target]
 
     # Display system info
     mem_gb = get_system_memory_gb()
+    avail_gb = get_available_memory_gb()
     print(f"\n{'='*60}")
     print("htop-win Cross-Compilation Build")
     print(f"{'='*60}")
     print(f"  CPU cores: {CPU_COUNT}")
     if mem_gb > 0:
         print(f"  Total RAM: {mem_gb:.1f} GB")
+    if avail_gb > 0:
+        print(f"  Available RAM: {avail_gb:.1f} GB")
     print(f"  Parallel jobs: {jobs if jobs else CPU_COUNT}")
+    print(f"  sccache: {'enabled' if use_sccache else 'disabled'}")
     print(f"  Output directory: {OUTPUT_DIR}")
 
     # Check prerequisites
@@ -286,14 +547,23 @@ def main():
     if args.action == "check":
         if not ensure_targets(target_names, dry_run=args.dry_run):
             sys.exit(1)
-        if not check_target(args.target, dry_run=args.dry_run):
+        if not check_target(
+            args.target, dry_run=args.dry_run, use_sccache=use_sccache
+        ):
             sys.exit(1)
         print(f"\n{args.target} {'dry run complete' if args.dry_run else 'check passed'}!")
 
     elif args.action == "build":
         if not ensure_targets(target_names, dry_run=args.dry_run):
             sys.exit(1)
-        if not build_target(args.target, jobs, dry_run=args.dry_run):
+        if not build_target(
+            args.target,
+            jobs,
+            dry_run=args.dry_run,
+            use_sccache=use_sccache,
+            mem_per_job=args.mem_per_job,
+            mem_budget_gb=avail_gb,
+        ):
             sys.exit(1)
 
         if args.dry_run:
@@ -312,11 +582,55 @@ def main():
         if not ensure_targets(target_names, dry_run=args.dry_run):
             sys.exit(1)
 
+        # Build all targets concurrently, splitting the job budget between
+        # them so the host isn't oversubscribed
+        per_target_jobs = max(1, (jobs or CPU_COUNT) // len(target_names))
+        per_target_mem_gb = avail_gb / len(target_names)
+        # Dry runs only print commands, so they don't write any logs
+        if args.dry_run:
+            log_paths = dict.fromkeys(target_names)
+            log_note = ""
+        else:
+            LOG_DIR.mkdir(parents=True, exist_ok=True)
+            log_paths = {name: LOG_DIR / f"{name}.log" for name in target_names}
+            log_note = f", logs in {LOG_DIR}"
+
+        print(f"\nBuilding {', '.join(target_names)} in parallel "
+              f"({per_target_jobs} jobs each{log_note})")
+        # Don't let forked workers inherit (and re-emit) unflushed output
+        sys.stdout.flush()
+
         results = {}
-        for target_name in target_names:
-            results[target_name] = build_target(
-                target_name, jobs, dry_run=args.dry_run
-            )
+        with ProcessPoolExecutor(max_workers=len(target_names)) as executor:
+            futures = {
+                executor.submit(
+                    build_target_logged,
+                    target_name,
+                    per_target_jobs,
+                    log_paths[target_name],
+                    args.dry_run,
+                    use_sccache,
+                    args.mem_per_job,
+                    per_target_mem_gb,
+                ): target_name
+                for target_name in target_names
+            }
+            for future in as_completed(futures):
+                target_name = futures[future]
+                try:
+                    results[target_name] = future.result()
+                except Exception as e:
+                    print(f"Error: {target_name} build raised {e!r}")
+                    results[target_name] = False
+                print(f"  {target_name}: "
+                      f"{'finished' if results[target_name] else 'FAILED'}")
+
+        if not args.dry_run:
+            for target_name in target_names:
+                print(f"  {target_name} log: {log_paths[target_name]}")
+
+        if use_sccache:
+            run_command([SCCACHE, "--show-stats"], dry_run=args.dry_run)
 
         if args.dry_run:
             print("\nAll-target dry run complete!")
@@ -327,8 +641,8 @@ def main():
         print(f"{'='*60}")
 
         all_success = True
-        for target_name, success in results.items():
-            if success:
+        for target_name in target_names:
+            if results[target_name]:
                 output = copy_to_output(target_name)
                 if output:
                     size_mb = output.stat().st_size / (1024 * 1024)
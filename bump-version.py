@@ -27,6 +27,15 @@ SEMVER_RE = re.compile(
     re.VERBOSE,
 )
 
+# First `version = "..."` key in Cargo.toml (the [package] version)
+CARGO_VERSION_RE = re.compile(r'^(version\s*=\s*)"([^"]+)"', re.MULTILINE)
+
+# Numeric and string version fields in htop.rc, matched in a single pass
+RESOURCE_VERSION_RE = re.compile(
+    r'(?P<numeric>(?:FILEVERSION|PRODUCTVERSION)\s+)\d+,\d+,\d+,\d+'
+    r'|(?P<string>VALUE\s+"(?:FileVersion|ProductVersion)",\s*)"[^"]+"'
+)
+
 WINDOWS_VERSION_COMPONENT_MAX = 65535
 
 
@@ -52,10 +61,10 @@ def parse_version(version_str: str) -> tuple[int, int, int]:
 def get_current_version() -> str:
     """Get current version from Cargo.toml."""
     content = CARGO_TOML.read_text()
-    match = re.search(r'^version\s*=\s*"([^"]+)"', content, re.MULTILINE)
+    match = CARGO_VERSION_RE.search(content)
     if not match:
         raise ValueError("Could not find version in Cargo.toml")
-    return match.group(1)
+    return match.group(2)
 
 
 def bump_version(current: str, bump_type: str) -> str:
@@ -78,12 +87,8 @@ def bump_version(current: str, bump_type: str) -> str:
 def update_cargo_toml(old_version: str, new_version: str) -> bool:
     """Update version in Cargo.toml."""
     content = CARGO_TOML.read_text()
-    new_content = re.sub(
-        r'^(version\s*=\s*)"[^"]+"',
-        f'\\1"{new_version}"',
-        content,
-        count=1,
-        flags=re.MULTILINE
+    new_content = CARGO_VERSION_RE.sub(
+        lambda m: f'{m.group(1)}"{new_version}"', content, count=1
     )
 
     if content == new_content:
@@ -104,29 +109,13 @@ def update_resource_file(old_version: str, new_version: str) -> bool:
     content = RESOURCE_FILE.read_text()
     major, minor, patch = parse_version(new_version)
 
-    # Update FILEVERSION and PRODUCTVERSION (comma-separated)
-    new_content = re.sub(
-        r'(FILEVERSION\s+)\d+,\d+,\d+,\d+',
-        f'\\g<1>{major},{minor},{patch},0',
-        content
-    )
-    new_content = re.sub(
-        r'(PRODUCTVERSION\s+)\d+,\d+,\d+,\d+',
-        f'\\g<1>{major},{minor},{patch},0',
-        new_content
-    )
+    def replace(match: re.Match) -> str:
+        # FILEVERSION/PRODUCTVERSION are comma-separated, the string values are SemVer
+        if match.group("numeric") is not None:
+            return f'{match.group("numeric")}{major},{minor},{patch},0'
+        return f'{match.group("string")}"{new_version}"'
 
-    # Update string versions
-    new_content = re.sub(
-        r'(VALUE\s+"FileVersion",\s*)"[^"]+"',
-        f'\\1"{new_version}"',
-        new_content
-    )
-    new_content = re.sub(
-        r'(VALUE\s+"ProductVersion",\s*)"[^"]+"',
-        f'\\1"{new_version}"',
-        new_content
-    )
+    new_content = RESOURCE_VERSION_RE.sub(replace, content)
 
     if content == new_content:
         print(f"  Warning: {RESOURCE_FILE.name} was not modified")
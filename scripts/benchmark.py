@@ -9,21 +9,119 @@ Usage:
     python scripts/benchmark.py --compare   # Compare with/without efficiency mode
 """
 
+import hashlib
 import subprocess
 import sys
 import re
 import os
 from pathlib import Path
 
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+RELEASE_EXE = PROJECT_ROOT / "target" / "release" / "htop-win.exe"
+# Records the source state RELEASE_EXE was built from
+BUILD_STAMP = RELEASE_EXE.with_name(RELEASE_EXE.name + ".stamp")
+
+ANSI_RE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+ITERATIONS_RE = re.compile(r'Iterations:\s*(\d+)\s*Processes:\s*(\d+)')
+TOTAL_AVG_RE = re.compile(r'Total:\s*([\d.]+)(\w+)\s*Avg:\s*([\d.]+)(\w+)')
+MIN_MAX_RE = re.compile(r'Min:\s*([\d.]+)(\w+)\s*Max:\s*([\d.]+)(\w+)')
+WALL_TIME_RE = re.compile(r'Wall time:\s*([\d.]+)(\w+)')
+CPU_TIME_RE = re.compile(r'CPU time:\s*([\d.]+)(\w+)')
+CPU_USAGE_RE = re.compile(r'CPU usage:\s*([\d.]+)%')
+
+def source_fingerprint() -> str:
+    """Hash the paths, sizes and mtimes of every input to the release build."""
+    inputs = [PROJECT_ROOT / "Cargo.toml", PROJECT_ROOT / "Cargo.lock", PROJECT_ROOT / "build.rs"]
+    inputs += sorted((PROJECT_ROOT / "src").rglob("*.rs"))
+    inputs += sorted((PROJECT_ROOT / "media").glob("*"))
+
+    digest = hashlib.blake2b(digest_size=16)
+    for path in inputs:
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        digest.update(f"{path.relative_to(PROJECT_ROOT)}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+def ensure_built() -> Path:
+    """Build the release executable unless it is current with the sources."""
+    fingerprint = source_fingerprint()
+    if RELEASE_EXE.exists() and BUILD_STAMP.exists() and BUILD_STAMP.read_text().strip() == fingerprint:
+        return RELEASE_EXE
+
+    print("Sources changed since last build, running 'cargo build --release'...")
+    try:
+        result = subprocess.run(["cargo", "build", "--release"], cwd=PROJECT_ROOT)
+    except FileNotFoundError:
+        if RELEASE_EXE.exists():
+            print("Warning: cargo not found, using existing build")
+            return RELEASE_EXE
+        print(f"Error: cargo not found and {RELEASE_EXE} does not exist.")
+        sys.exit(1)
+    if result.returncode != 0:
+        print(f"Error: cargo build failed with exit code {result.returncode}")
+        sys.exit(1)
+
+    BUILD_STAMP.write_text(fingerprint)
+    return RELEASE_EXE
+
 def strip_ansi(text: str) -> str:
     """Remove ANSI escape codes from text."""
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    return ansi_escape.sub('', text)
+    return ANSI_RE.sub('', text)
+
+def parse_benchmark_output(output: str) -> dict:
+    """Parse the benchmark report in a single pass over its lines."""
+    stats = {}
+    timings = {}
+    section = None
+
+    for raw_line in output.split('\n'):
+        # Report lines are framed by box-drawing borders
+        line = raw_line.strip().strip('║').strip()
+
+        if line.startswith('Iterations'):
+            match = ITERATIONS_RE.match(line)
+            if match:
+                stats['iterations'] = int(match.group(1))
+                stats['processes'] = int(match.group(2))
+        elif line.startswith('REFRESH'):
+            section = timings.setdefault('refresh', {})
+        elif line.startswith('DRAW'):
+            section = timings.setdefault('draw', {})
+        elif line.startswith('Total') and section is not None:
+            match = TOTAL_AVG_RE.match(line)
+            if match:
+                section['total'] = f"{match.group(1)}{match.group(2)}"
+                section['avg'] = f"{match.group(3)}{match.group(4)}"
+        elif line.startswith('Min') and section is not None:
+            match = MIN_MAX_RE.match(line)
+            if match:
+                section['min'] = f"{match.group(1)}{match.group(2)}"
+                section['max'] = f"{match.group(3)}{match.group(4)}"
+        elif line.startswith('Wall'):
+            match = WALL_TIME_RE.match(line)
+            if match:
+                stats['wall_time'] = f"{match.group(1)}{match.group(2)}"
+        elif line.startswith('CPU time'):
+            match = CPU_TIME_RE.match(line)
+            if match:
+                stats['cpu_time'] = f"{match.group(1)}{match.group(2)}"
+        elif line.startswith('CPU usage'):
+            match = CPU_USAGE_RE.match(line)
+            if match:
+                stats['cpu_usage'] = float(match.group(1))
+
+    # Only report timing sections that were fully parsed
+    for name, values in timings.items():
+        if len(values) == 4:
+            stats[name] = values
+
+    return stats
 
 def run_benchmark(iterations: int = 20, extra_args: list = None) -> dict:
     """Run htop-win in benchmark mode and return parsed results."""
-    project_root = Path(__file__).parent.parent
-    exe_path = project_root / "target" / "release" / "htop-win.exe"
+    exe_path = RELEASE_EXE
 
     if not exe_path.exists():
         print(f"Error: {exe_path} not found. Run 'cargo build --release' first.")
@@ -41,52 +139,7 @@ def run_benchmark(iterations: int = 20, extra_args: list = None) -> dict:
     if result.returncode != 0:
         raise RuntimeError(f"benchmark command failed with exit code {result.returncode}\n{output}")
 
-    # Parse the benchmark results
-    stats = {}
-
-    # Extract iterations and process count
-    match = re.search(r'Iterations:\s*(\d+)\s*Processes:\s*(\d+)', output)
-    if match:
-        stats['iterations'] = int(match.group(1))
-        stats['processes'] = int(match.group(2))
-
-    # Extract REFRESH stats
-    refresh_match = re.search(
-        r'REFRESH.*?Total:\s*([\d.]+)(\w+).*?Avg:\s*([\d.]+)(\w+).*?Min:\s*([\d.]+)(\w+).*?Max:\s*([\d.]+)(\w+)',
-        output, re.DOTALL
-    )
-    if refresh_match:
-        stats['refresh'] = {
-            'total': f"{refresh_match.group(1)}{refresh_match.group(2)}",
-            'avg': f"{refresh_match.group(3)}{refresh_match.group(4)}",
-            'min': f"{refresh_match.group(5)}{refresh_match.group(6)}",
-            'max': f"{refresh_match.group(7)}{refresh_match.group(8)}",
-        }
-
-    # Extract DRAW stats
-    draw_match = re.search(
-        r'DRAW.*?Total:\s*([\d.]+)(\w+).*?Avg:\s*([\d.]+)(\w+).*?Min:\s*([\d.]+)(\w+).*?Max:\s*([\d.]+)(\w+)',
-        output, re.DOTALL
-    )
-    if draw_match:
-        stats['draw'] = {
-            'total': f"{draw_match.group(1)}{draw_match.group(2)}",
-            'avg': f"{draw_match.group(3)}{draw_match.group(4)}",
-            'min': f"{draw_match.group(5)}{draw_match.group(6)}",
-            'max': f"{draw_match.group(7)}{draw_match.group(8)}",
-        }
-
-    # Extract OVERALL stats
-    wall_match = re.search(r'Wall time:\s*([\d.]+)(\w+)', output)
-    cpu_time_match = re.search(r'CPU time:\s*([\d.]+)(\w+)', output)
-    cpu_usage_match = re.search(r'CPU usage:\s*([\d.]+)%', output)
-
-    if wall_match:
-        stats['wall_time'] = f"{wall_match.group(1)}{wall_match.group(2)}"
-    if cpu_time_match:
-        stats['cpu_time'] = f"{cpu_time_match.group(1)}{cpu_time_match.group(2)}"
-    if cpu_usage_match:
-        stats['cpu_usage'] = float(cpu_usage_match.group(1))
+    stats = parse_benchmark_output(output)
 
     required = ['iterations', 'processes', 'wall_time', 'cpu_time', 'cpu_usage']
     missing = [key for key in required if key not in stats]
@@ -158,6 +211,8 @@ def main():
             print(__doc__)
             sys.exit(0)
 
+    ensure_built()
+
     if compare:
         compare_mode(iterations)
     else:
@@ -1,40 +1,127 @@
 #!/usr/bin/env python3
 """Compare CPU utilization between old and new htop-win versions."""
 
+import ctypes
 import subprocess
 import time
 import os
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from benchmark import RELEASE_EXE, ensure_built
+
+# Delay between starting the two measurements so their launches don't collide
+LAUNCH_STAGGER = 0.05
+
+# Native Win32 access for exact CPU times; None when not running on Windows
+try:
+    from ctypes import wintypes
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    kernel32.GetProcessTimes.argtypes = (wintypes.HANDLE,) + (ctypes.POINTER(wintypes.FILETIME),) * 4
+    kernel32.GetProcessTimes.restype = wintypes.BOOL
+    kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+    kernel32.CloseHandle.restype = wintypes.BOOL
+except (AttributeError, OSError, ValueError):
+    kernel32 = None
+
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+SW_HIDE = 0
+
+def filetime_ms(ft):
+    """Convert a FILETIME duration (100ns units) to milliseconds."""
+    return ((ft.dwHighDateTime << 32) | ft.dwLowDateTime) / 10_000
+
+def run_and_measure(exe_path, args):
+    """Run exe in a hidden console and return its user + kernel CPU time in ms."""
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    startupinfo.wShowWindow = SW_HIDE
+    proc = subprocess.Popen(
+        [str(exe_path), *args],
+        creationflags=subprocess.CREATE_NEW_CONSOLE,
+        startupinfo=startupinfo,
+    )
+
+    # Open our own handle before the process exits; GetProcessTimes stays
+    # valid on it after exit
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, proc.pid)
+    if not handle:
+        error = ctypes.WinError(ctypes.get_last_error())
+        proc.kill()
+        proc.wait()
+        raise error
+    try:
+        returncode = proc.wait()
+        creation, exit_time, kernel, user = (wintypes.FILETIME() for _ in range(4))
+        if not kernel32.GetProcessTimes(
+            handle, ctypes.byref(creation), ctypes.byref(exit_time),
+            ctypes.byref(kernel), ctypes.byref(user)
+        ):
+            raise ctypes.WinError(ctypes.get_last_error())
+    finally:
+        kernel32.CloseHandle(handle)
+
+    if returncode != 0:
+        raise RuntimeError(f"{exe_path} exited with code {returncode}")
+    return filetime_ms(kernel) + filetime_ms(user)
+
 def measure_cpu_time(exe_path, iterations=20, delay=100, runs=3):
     """Run exe multiple times and measure CPU time."""
+    if kernel32 is None:
+        return measure_cpu_time_powershell(exe_path, iterations, delay, runs)
+
+    args = ['--max-iterations', str(iterations), '--delay', str(delay), '--no-mouse']
     results = []
     for i in range(runs):
-        cmd = f'''
-$proc = Start-Process -FilePath '{exe_path}' -ArgumentList '--max-iterations','{iterations}','--delay','{delay}','--no-mouse' -PassThru -WindowStyle Hidden
-$proc.WaitForExit()
-$proc.TotalProcessorTime.TotalMilliseconds
+        try:
+            results.append(run_and_measure(exe_path, args))
+        except (OSError, RuntimeError) as exc:
+            raise RuntimeError(f"Run {i + 1} failed for {exe_path}: {exc}") from exc
+    return results
+
+def measure_cpu_time_powershell(exe_path, iterations=20, delay=100, runs=3):
+    """Measure CPU time via PowerShell, for hosts without native Win32 access."""
+    # One PowerShell session for all runs; its startup cost dwarfs short runs
+    exe = str(exe_path).replace("'", "''")
+    cmd = f'''
+1..{runs} | ForEach-Object {{
+    $proc = Start-Process -FilePath '{exe}' -ArgumentList '--max-iterations','{iterations}','--delay','{delay}','--no-mouse' -PassThru -WindowStyle Hidden
+    $proc.WaitForExit()
+    $proc.TotalProcessorTime.TotalMilliseconds
+}}
 '''
-        result = subprocess.run(
-            ['powershell', '-Command', cmd],
-            capture_output=True, text=True
+    result = subprocess.run(
+        ['powershell', '-NoProfile', '-Command', cmd],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"Runs failed for {exe_path} with exit code {result.returncode}\n"
+            f"stdout:\n{result.stdout}\n"
+            f"stderr:\n{result.stderr}"
         )
-        if result.returncode != 0:
-            raise RuntimeError(
-                f"Run {i + 1} failed for {exe_path} with exit code {result.returncode}\n"
-                f"stdout:\n{result.stdout}\n"
-                f"stderr:\n{result.stderr}"
-            )
+
+    lines = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+    if len(lines) != runs:
+        raise RuntimeError(
+            f"Expected {runs} CPU times for {exe_path}, got {len(lines)}: "
+            f"{result.stdout!r}"
+        )
+
+    results = []
+    for i, line in enumerate(lines):
         try:
-            cpu_ms = float(result.stdout.strip())
-            results.append(cpu_ms)
-            print(f"  Run {i+1}: {cpu_ms:.0f}ms")
+            cpu_ms = float(line)
         except ValueError as exc:
             raise RuntimeError(
                 f"Run {i + 1} did not return numeric CPU time for {exe_path}: "
-                f"{result.stdout!r}"
+                f"{line!r}"
             ) from exc
+        results.append(cpu_ms)
     if not results:
         raise RuntimeError(f"No successful benchmark runs for {exe_path}")
     return results
@@ -51,6 +138,9 @@ def main():
     args = parser.parse_args()
     old_exe = args.old_exe
     new_exe = args.new_exe
+    # Rebuild the project's own release binary if it is one of the two
+    if any(Path(path).resolve() == RELEASE_EXE for path in (old_exe, new_exe)):
+        ensure_built()
     for path in (old_exe, new_exe):
         if not Path(path).exists():
             raise SystemExit(f"Executable not found: {path}")
@@ -59,12 +149,26 @@ def main():
     print(f"  CPU UTILIZATION COMPARISON ({args.iterations} iterations, {args.delay}ms delay)")
     print("=" * 60)
 
-    print(f"\n{args.old_label.upper()}:")
-    old_results = measure_cpu_time(old_exe, args.iterations, args.delay, args.runs)
-    old_avg = sum(old_results) / len(old_results)
+    # Both executables are measured at once; each run reads its own
+    # process's CPU time, so they don't skew each other's numbers
+    print("\nMeasuring both executables in parallel...")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        old_future = executor.submit(
+            measure_cpu_time, old_exe, args.iterations, args.delay, args.runs
+        )
+        time.sleep(LAUNCH_STAGGER)
+        new_future = executor.submit(
+            measure_cpu_time, new_exe, args.iterations, args.delay, args.runs
+        )
+        old_results = old_future.result()
+        new_results = new_future.result()
 
-    print(f"\n{args.new_label.upper()}:")
-    new_results = measure_cpu_time(new_exe, args.iterations, args.delay, args.runs)
+    for label, results in ((args.old_label, old_results), (args.new_label, new_results)):
+        print(f"\n{label.upper()}:")
+        for i, cpu_ms in enumerate(results):
+            print(f"  Run {i+1}: {cpu_ms:.0f}ms")
+
+    old_avg = sum(old_results) / len(old_results)
     new_avg = sum(new_results) / len(new_results)
 
     print("\n" + "=" * 60)
@@ -1,60 +1,92 @@
 """Optimize GIF for web - reduce size while maintaining quality"""
-from PIL import Image
+from PIL import Image, ImageSequence
 import os
+import shutil
+import subprocess
+import tempfile
+
+# gifski encodes with multiple threads and better palettes than PIL (None if not installed)
+GIFSKI = shutil.which("gifski")
+
+def save_with_gifski(frames, output_path, fps):
+    """Encode RGB frames to a looping GIF with gifski at their current size"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, frame in enumerate(frames):
+            path = os.path.join(tmp, f"frame_{i:05d}.png")
+            frame.save(path, compress_level=1)  # Temporary, favor speed
+            paths.append(path)
+
+        subprocess.run(
+            [GIFSKI, "--quiet", "-o", output_path, "--fps", f"{fps:g}",
+             "--width", str(frames[0].width), *paths],
+            check=True
+        )
 
 def optimize_gif_web(input_path, output_path, max_width=800):
     """Optimize GIF for web with best compression"""
     print(f"Loading {input_path}...")
     img = Image.open(input_path)
 
+    # convert() already returns a new image, so no defensive copy is needed
     frames = []
     durations = []
-
-    try:
-        while True:
-            frame = img.copy().convert('RGB')
-            frames.append(frame)
-            durations.append(img.info.get('duration', 125))
-            img.seek(img.tell() + 1)
-    except EOFError:
-        pass
+    for frame in ImageSequence.Iterator(img):
+        frames.append(frame.convert('RGB'))
+        # A duration of 0 is legal (viewers play it at their own default),
+        # so treat it like a missing one
+        durations.append(frame.info.get('duration') or 125)
 
     print(f"  Original: {frames[0].width}x{frames[0].height}, {len(frames)} frames")
 
     # Resize using nearest neighbor for crisp text (no antialiasing artifacts)
+    new_size = frames[0].size
     if frames[0].width > max_width:
         ratio = max_width / frames[0].width
         new_size = (max_width, int(frames[0].height * ratio))
-        frames = [f.resize(new_size, Image.Resampling.NEAREST) for f in frames]
         print(f"  Resized to: {new_size[0]}x{new_size[1]}")
 
+    if GIFSKI:
+        # Resize here so gifski doesn't resample text with its smoothing filter
+        if new_size != frames[0].size:
+            frames = [f.resize(new_size, Image.Resampling.NEAREST) for f in frames]
+        print("  Encoding with gifski...")
+        save_with_gifski(frames, output_path, fps=1000 / durations[0])
+    else:
+        save_with_pil(frames, output_path, new_size, durations[0])
+
+    orig_size = os.path.getsize(input_path) / 1024
+    new_size_kb = os.path.getsize(output_path) / 1024
+    print(f"  Original: {orig_size:.0f} KB")
+    print(f"  Optimized: {new_size_kb:.0f} KB ({(1 - new_size_kb/orig_size)*100:.0f}% reduction)")
+    print(f"  Saved: {output_path}")
+
+def save_with_pil(frames, output_path, size, duration, colors=64):
+    """Quantize frames to a shared palette and encode with PIL"""
     # Create global palette from first frame for consistent colors
-    palette_img = frames[0].quantize(colors=64, method=Image.Quantize.MEDIANCUT)
-    palette = palette_img.getpalette()
+    first = frames[0].resize(size, Image.Resampling.NEAREST)
+    palette_img = first.quantize(colors=colors, method=Image.Quantize.MEDIANCUT)
 
-    # Apply same palette to all frames (much better compression)
-    frames_p = []
-    for frame in frames:
-        frame_p = frame.quantize(colors=64, palette=palette_img, dither=Image.Dither.NONE)
-        frames_p.append(frame_p)
+    # Resize and apply same palette to all frames (much better compression).
+    # With a fixed palette this is a cheap per-pixel lookup, so it runs inline;
+    # handing frames to worker processes costs more in pickling than it saves
+    frames_p = [
+        (f if f.size == size else f.resize(size, Image.Resampling.NEAREST))
+        .quantize(palette=palette_img, dither=Image.Dither.NONE)
+        for f in frames
+    ]
 
     # Save with optimization
     frames_p[0].save(
         output_path,
         save_all=True,
         append_images=frames_p[1:],
-        duration=durations[0],
+        duration=duration,
         loop=0,
         optimize=True,
         disposal=2  # Restore to background - helps with compression
     )
 
-    orig_size = os.path.getsize(input_path) / 1024
-    new_size_kb = os.path.getsize(output_path) / 1024
-    print(f"  Original: {orig_size:.0f} KB")
-    print(f"  Optimized: {new_size_kb:.0f} KB ({(1 - new_size_kb/orig_size)*100:.0f}% reduction)")
-    print(f"  Saved: {output_path}")
-
 if __name__ == '__main__':
     # Web optimized version
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -1,13 +1,17 @@
 """
 Record htop-win demo as animated GIF using Python
 """
+import queue
 import subprocess
+import threading
 import time
 import mss
 import pyautogui
 from PIL import Image
 import os
 
+from optimize_gif import GIFSKI, save_with_gifski, save_with_pil
+
 def find_window_region(crop_chrome=True):
     """Find the htop-win window region, optionally cropping window chrome"""
     try:
@@ -44,6 +48,23 @@ def capture_frames(duration=15, fps=4):
     frames = []
     interval = 1.0 / fps
 
+    # Decode on a worker thread so the capture loop only grabs and schedules
+    pending = queue.Queue(maxsize=16)
+    errors = []
+
+    def convert_frames():
+        while (screenshot := pending.get()) is not None:
+            # After a failure keep draining, so the capture loop never blocks
+            # on a full queue; the error is re-raised once the thread is joined
+            if errors:
+                continue
+            try:
+                # Decode straight from the raw buffer; .bgra would copy it first
+                frames.append(Image.frombuffer(
+                    "RGB", screenshot.size, screenshot.raw, "raw", "BGRX", 0, 1))
+            except Exception as exc:
+                errors.append(exc)
+
     with mss.mss() as sct:
         # Try to find htop-win window, otherwise use primary monitor
         region = find_window_region()
@@ -60,25 +81,32 @@ def capture_frames(duration=15, fps=4):
                        "height": min(monitor["height"], 800)}
             print(f"Recording screen region: {monitor}")
 
-        start_time = time.time()
-        frame_count = 0
-
-        while time.time() - start_time < duration:
-            # Capture screenshot
-            screenshot = sct.grab(monitor)
-            img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
-            frames.append(img)
-            frame_count += 1
+        converter = threading.Thread(target=convert_frames)
+        converter.start()
 
-            # Wait for next frame
-            elapsed = time.time() - start_time
-            next_frame_time = frame_count * interval
-            if next_frame_time > elapsed:
-                time.sleep(next_frame_time - elapsed)
-
-            if frame_count % fps == 0:
-                print(f"  Recorded {frame_count} frames ({int(elapsed)}s)...")
+        start_time = time.perf_counter()
+        frame_count = 0
 
+        try:
+            while time.perf_counter() - start_time < duration and not errors:
+                # Capture screenshot
+                pending.put(sct.grab(monitor))
+                frame_count += 1
+
+                # Wait for next frame
+                elapsed = time.perf_counter() - start_time
+                next_frame_time = frame_count * interval
+                if next_frame_time > elapsed:
+                    time.sleep(next_frame_time - elapsed)
+
+                if frame_count % fps == 0:
+                    print(f"  Recorded {frame_count} frames ({int(elapsed)}s)...")
+        finally:
+            pending.put(None)
+            converter.join()
+
+    if errors:
+        raise errors[0]
     return frames
 
 def simulate_demo():
@@ -108,22 +136,14 @@ def create_gif(frames, output_path, fps=4):
     # Keep full resolution - no downscaling
     print(f"  Frame size: {frames[0].width}x{frames[0].height}")
 
-    # Convert to palette mode for GIF format
-    frames_p = []
-    for frame in frames:
-        frame_p = frame.convert('P', palette=Image.Palette.ADAPTIVE, colors=256)
-        frames_p.append(frame_p)
-
-    # Save as GIF
-    duration = int(1000 / fps)  # ms per frame
-    frames_p[0].save(
-        output_path,
-        save_all=True,
-        append_images=frames_p[1:],
-        duration=duration,
-        loop=0,
-        optimize=True
-    )
+    if GIFSKI:
+        print("  Encoding with gifski...")
+        save_with_gifski(frames, output_path, fps)
+    else:
+        # One global palette from the first frame: a cheap lookup per frame
+        # instead of a per-frame adaptive quantize, and better compression
+        duration = int(1000 / fps)  # ms per frame
+        save_with_pil(frames, output_path, frames[0].size, duration, colors=256)
 
     size_mb = os.path.getsize(output_path) / (1024 * 1024)
     print(f"Saved: {output_path} ({len(frames)} frames, {size_mb:.1f} MB)")
@@ -150,7 +170,6 @@ def main():
     print("   Simulating navigation...\n")
 
     # Start demo simulation in background
-    import threading
     demo_thread = threading.Thread(target=simulate_demo)
     demo_thread.start()
 
@@ -15,12 +15,37 @@ Usage:
 """
 
 import argparse
-import re
-import subprocess
+import string
 import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
+
+# Translation table deleting the characters allowed inside a CPU bar
+CPU_BAR_CHARS = str.maketrans('', '', '| 0123456789.%')
+# Translation table deleting ASCII digits
+DIGIT_CHARS = str.maketrans('', '', string.digits)
+
+
+def has_digit(line: str) -> bool:
+    """Check whether a line contains any ASCII digit"""
+    # Deleting the digits in C changes the line only if it had any
+    return line.translate(DIGIT_CHARS) != line
+
+
+def has_time(line: str) -> bool:
+    """Check whether a line contains a digits:digits time such as 12:34"""
+    colon = line.find(':', 1)
+    while colon >= 0:
+        if line[colon - 1].isdecimal() and line[colon + 1:colon + 2].isdecimal():
+            return True
+        colon = line.find(':', colon + 1)
+    return False
+
+
+def decode_line(line: bytes) -> str:
+    """Decode one line of captured terminal output"""
+    return line.decode("utf-8", errors="replace")
 
 
 @dataclass
@@ -37,35 +62,25 @@ class HtopValidator:
     def validate_cpu_bar(line: str) -> TestResult:
         """Validate CPU bar format matches htop"""
         # Pattern: "  N[|||||...     XX.X%]"
-        pattern = r'^\s*\d+\[[\|\s]+\d+\.\d%\]'
-
-        if not line.strip():
+        if not line or line.isspace():
             return TestResult("CPU Bar", False, "Empty line")
 
         # Check for bracket structure
-        if '[' not in line or ']' not in line:
+        bar_start = line.find('[')
+        bar_end = line.find(']')
+        if bar_start < 0 or bar_end < 0:
             return TestResult("CPU Bar", False, "Missing brackets")
 
         # Check for percentage
         if '%' not in line:
             return TestResult("CPU Bar", False, "Missing percentage")
 
-        # Extract bar content
-        try:
-            bar_start = line.index('[')
-            bar_end = line.index(']')
-            bar_content = line[bar_start + 1:bar_end]
-
-            # Bar should contain only |, spaces, and the percentage
-            valid_chars = set('| 0123456789.%')
-            bar_chars = set(bar_content)
-            invalid = bar_chars - valid_chars
-
-            if invalid:
-                return TestResult("CPU Bar", False, f"Invalid chars: {invalid}")
-
-        except ValueError:
-            return TestResult("CPU Bar", False, "Malformed bar structure")
+        # Bar should contain only |, spaces, and the percentage; deleting
+        # those leaves exactly the invalid characters
+        invalid = line[bar_start + 1:bar_end].translate(CPU_BAR_CHARS)
+        if invalid:
+            # Keep the first occurrence of each, in order, so the message is stable
+            return TestResult("CPU Bar", False, f"Invalid chars: {''.join(dict.fromkeys(invalid))!r}")
 
         return TestResult("CPU Bar", True, "OK")
 
@@ -128,7 +143,7 @@ class HtopValidator:
             return TestResult("Tasks Line", False, "Must start with 'Tasks:'")
 
         # Should contain a number
-        if not re.search(r'\d+', line):
+        if not has_digit(line):
             return TestResult("Tasks Line", False, "Missing task count")
 
         return TestResult("Tasks Line", True, "OK")
@@ -140,7 +155,7 @@ class HtopValidator:
             return TestResult("Uptime Line", False, "Must start with 'Uptime:'")
 
         # Should contain time format (digits and colons)
-        if not re.search(r'\d+:\d+', line):
+        if not has_time(line):
             return TestResult("Uptime Line", False, "Missing time format")
 
         return TestResult("Uptime Line", True, "OK")
@@ -153,8 +168,8 @@ class UITester:
         self.snapshots_dir = Path(snapshots_dir)
         self.validator = HtopValidator()
 
-    def validate_screen(self, lines: list[str]) -> list[TestResult]:
-        """Validate a full screen of output"""
+    def validate_screen(self, lines: list[bytes]) -> list[TestResult]:
+        """Validate a full screen of raw terminal output, one bytes object per line"""
         results = []
 
         if len(lines) < 10:
@@ -163,50 +178,83 @@ class UITester:
 
         results.append(TestResult("Screen Size", True, f"{len(lines)} lines"))
 
-        # Find CPU bars (first few lines with [ and ])
-        cpu_bar_count = 0
-        for i, line in enumerate(lines[:20]):
-            if re.match(r'^\s*\d+\[', line):
-                result = self.validator.validate_cpu_bar(line)
-                result.name = f"CPU Bar {cpu_bar_count}"
-                results.append(result)
-                cpu_bar_count += 1
-
-        if cpu_bar_count == 0:
+        # Single pass over the screen; results are collected per section and
+        # emitted in a fixed order afterwards. Lines are scanned as raw bytes
+        # and only the ones handed to a validator get decoded
+        cpu_results = []
+        memory_results = []
+        seen_memory = seen_swap = False
+        tasks_result = None
+        uptime_result = None
+        header_result = None
+        footer_result = None
+        total = len(lines)
+        footer_start = total - 5
+        # Mem, Swp, Tasks, Uptime, header and footer are each taken once
+        remaining_sections = 6
+
+        i = 0
+        while i < total:
+            line = lines[i]
+            # CPU bars: first few lines shaped like "  N[" (digits, then '[')
+            if i < 20:
+                head, bracket, _ = line.lstrip().partition(b'[')
+                if bracket and head.isdigit():
+                    result = self.validator.validate_cpu_bar(decode_line(line))
+                    result.name = f"CPU Bar {len(cpu_results)}"
+                    cpu_results.append(result)
+
+            # Meter lines are told apart by their first four characters
+            head = line[:4]
+            if head == b"Mem[":
+                if not seen_memory:
+                    memory_results.append(self.validator.validate_memory_bar(decode_line(line)))
+                    seen_memory = True
+                    remaining_sections -= 1
+            elif head == b"Swp[":
+                if not seen_swap:
+                    result = self.validator.validate_memory_bar(decode_line(line))
+                    result.name = "Swap Bar"
+                    memory_results.append(result)
+                    seen_swap = True
+                    remaining_sections -= 1
+            elif head == b"Task":
+                if tasks_result is None and line.startswith(b"Tasks:"):
+                    tasks_result = self.validator.validate_tasks_line(decode_line(line))
+                    remaining_sections -= 1
+            elif head == b"Upti":
+                if uptime_result is None and line.startswith(b"Uptime:"):
+                    uptime_result = self.validator.validate_uptime_line(decode_line(line))
+                    remaining_sections -= 1
+
+            # Find process header (contains PID and Command)
+            if header_result is None and b"PID" in line and b"Command" in line:
+                header_result = self.validator.validate_process_header(decode_line(line))
+                remaining_sections -= 1
+
+            # Find footer (contains F1 and F10) in the last few lines
+            if footer_result is None and i >= footer_start and b"F1" in line and b"F10" in line:
+                footer_result = self.validator.validate_footer(decode_line(line))
+                remaining_sections -= 1
+
+            i += 1
+            # Past the CPU bars, stop once every section is found; if only the
+            # footer is missing, skip the process rows to the last few lines
+            if i >= 20:
+                if remaining_sections == 0:
+                    break
+                if remaining_sections == 1 and footer_result is None and i < footer_start:
+                    i = footer_start
+
+        results.extend(cpu_results)
+        if not cpu_results:
             results.append(TestResult("CPU Bars", False, "No CPU bars found"))
-
-        # Find memory bars
-        for line in lines:
-            if line.startswith("Mem["):
-                results.append(self.validator.validate_memory_bar(line))
-            elif line.startswith("Swp["):
-                result = self.validator.validate_memory_bar(line)
-                result.name = "Swap Bar"
-                results.append(result)
-
-        # Find Tasks line
-        for line in lines:
-            if line.startswith("Tasks:"):
-                results.append(self.validator.validate_tasks_line(line))
-                break
-
-        # Find Uptime line
-        for line in lines:
-            if line.startswith("Uptime:"):
-                results.append(self.validator.validate_uptime_line(line))
-                break
-
-        # Find process header (contains PID and Command)
-        for line in lines:
-            if "PID" in line and "Command" in line:
-                results.append(self.validator.validate_process_header(line))
-                break
-
-        # Find footer (contains F1 and F10)
-        for line in lines[-5:]:
-            if "F1" in line and "F10" in line:
-                results.append(self.validator.validate_footer(line))
-                break
+        results.extend(memory_results)
+        results.extend(
+            result
+            for result in (tasks_result, uptime_result, header_result, footer_result)
+            if result is not None
+        )
 
         return results
 
@@ -219,34 +267,24 @@ class UITester:
         # Test 1: Validate reference patterns
         print("\n[Test 1] Validating reference patterns...")
 
-        test_patterns = {
-            "CPU Bar 0%": "  0[                                          0.0%]",
-            "CPU Bar 50%": "  0[|||||||||||||||||||||                    50.0%]",
-            "CPU Bar 100%": "  0[|||||||||||||||||||||||||||||||||||||||| 100.0%]",
-            "Memory Bar": "Mem[|||||||||||||||||||||||||||||||||     4.52G/7.89G]",
-            "Swap Bar": "Swp[                                        0K/2.00G]",
-            "Tasks": "Tasks: 245, 892 thr",
-            "Uptime": "Uptime: 12:34:56",
-            "Header": "  PID USER      PRI  NI  VIRT   RES   SHR S CPU% MEM%   TIME+  Command",
-            "Footer": "F1Help  F2Setup F3Search F4Filter F5Tree  F6Sort F7Pri F8Pri F9Force F10Quit",
-        }
+        validator = self.validator
+        test_patterns: list[tuple[str, str, Callable[[str], TestResult]]] = [
+            ("CPU Bar 0%", "  0[                                          0.0%]", validator.validate_cpu_bar),
+            ("CPU Bar 50%", "  0[|||||||||||||||||||||                    50.0%]", validator.validate_cpu_bar),
+            ("CPU Bar 100%", "  0[|||||||||||||||||||||||||||||||||||||||| 100.0%]", validator.validate_cpu_bar),
+            ("Memory Bar", "Mem[|||||||||||||||||||||||||||||||||     4.52G/7.89G]", validator.validate_memory_bar),
+            ("Swap Bar", "Swp[                                        0K/2.00G]", validator.validate_memory_bar),
+            ("Tasks", "Tasks: 245, 892 thr", validator.validate_tasks_line),
+            ("Uptime", "Uptime: 12:34:56", validator.validate_uptime_line),
+            ("Header", "  PID USER      PRI  NI  VIRT   RES   SHR S CPU% MEM%   TIME+  Command",
+             validator.validate_process_header),
+            ("Footer", "F1Help  F2Setup F3Search F4Filter F5Tree  F6Sort F7Pri F8Pri F9Force F10Quit",
+             validator.validate_footer),
+        ]
 
         all_passed = True
-        for name, pattern in test_patterns.items():
-            if "CPU" in name:
-                result = self.validator.validate_cpu_bar(pattern)
-            elif "Memory" in name or "Swap" in name:
-                result = self.validator.validate_memory_bar(pattern)
-            elif "Tasks" in name:
-                result = self.validator.validate_tasks_line(pattern)
-            elif "Uptime" in name:
-                result = self.validator.validate_uptime_line(pattern)
-            elif "Header" in name:
-                result = self.validator.validate_process_header(pattern)
-            elif "Footer" in name:
-                result = self.validator.validate_footer(pattern)
-            else:
-                result = TestResult(name, True, "Skipped")
+        for name, pattern, validate in test_patterns:
+            result = validate(pattern)
 
             status = "[PASS]" if result.passed else "[FAIL]"
             print(f"  {status} {name}: {result.message}")
@@ -258,15 +296,14 @@ class UITester:
         print("\n[Test 2] Component validation tests...")
 
         component_tests = [
-            ("CPU bar with no fill", "  0[                    0.0%]", "validate_cpu_bar"),
-            ("CPU bar with full fill", "  7[|||||||||||||||||| 99.9%]", "validate_cpu_bar"),
-            ("Memory with GB", "Mem[|||||||       8.0G/16.0G]", "validate_memory_bar"),
-            ("Memory with MB", "Mem[|||||||       512M/1024M]", "validate_memory_bar"),
+            ("CPU bar with no fill", "  0[                    0.0%]", validator.validate_cpu_bar),
+            ("CPU bar with full fill", "  7[|||||||||||||||||| 99.9%]", validator.validate_cpu_bar),
+            ("Memory with GB", "Mem[|||||||       8.0G/16.0G]", validator.validate_memory_bar),
+            ("Memory with MB", "Mem[|||||||       512M/1024M]", validator.validate_memory_bar),
         ]
 
-        for name, pattern, validator_method in component_tests:
-            method = getattr(self.validator, validator_method)
-            result = method(pattern)
+        for name, pattern, validate in component_tests:
+            result = validate(pattern)
             status = "[PASS]" if result.passed else "[FAIL]"
             print(f"  {status} {name}: {result.message}")
 
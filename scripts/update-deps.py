@@ -1,14 +1,121 @@
 #!/usr/bin/env python3
 """
 Auto-update Cargo.toml dependencies to their latest versions.
-Usage: python update-deps.py [--dry-run]
+Usage: python update-deps.py [--dry-run] [--no-cache]
 """
 
+import http.client
+import json
+import os
 import re
-import subprocess
 import sys
+import threading
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Concurrent crates.io lookups; each one mostly waits on the network
+MAX_LOOKUPS = 16
+
+# crates.io sparse registry index: one JSON line per published version
+SPARSE_INDEX_HOST = "index.crates.io"
+USER_AGENT = "htop-win update-deps (https://github.com/faratech/htop-win)"
+
+# Each worker thread reuses its own keep-alive connection to the index
+thread_state = threading.local()
+
+# Latest versions seen on crates.io, reused for a day across runs
+CACHE_PATH = Path.home() / ".cache" / "htop-win" / "crates-versions.json"
+CACHE_TTL = 24 * 60 * 60
+
+# Dependency tables, at top level or under [target.'cfg(...)']
+DEPENDENCY_TABLES = ("dependencies", "dev-dependencies", "build-dependencies")
+# Dependency section headers in one match: [dependencies.crate] style tables
+# set `crate`; [dependencies], [target.'cfg(windows)'.build-dependencies], ...
+# set `section`
+DEP_HEADER_RE = re.compile(
+    r'^\[(?:(?:target\..+\.)?(?:dev-|build-)?dependencies\.(?P<crate>[\w-]+)'
+    r'|(?P<section>(?:workspace\.|target\..+\.)?(?:dev-|build-)?dependencies))\]'
+)
+# Version of a dependency entry: crate.version = "..", crate = "..", crate = { .., version = ".." }
+DEP_VERSION_RE = re.compile(
+    r'^([\w-]+)\s*(?:\.\s*version\s*=\s*"([^"]+)"'
+    r'|=\s*(?:"([^"]+)"|\{.*?(?<![\w-])version\s*=\s*"([^"]+)"))'
+)
+# version = ".." line inside a [dependencies.crate] table
+TABLE_VERSION_RE = re.compile(r'^\s*version\s*=\s*"([^"]+)"')
+
+
+def sparse_index_path(crate_name: str) -> str:
+    """Get the sparse index path for a crate (e.g. serde -> /se/rd/serde)."""
+    name = crate_name.lower()
+    if len(name) <= 2:
+        return f"/{len(name)}/{name}"
+    if len(name) == 3:
+        return f"/3/{name[0]}/{name}"
+    return f"/{name[:2]}/{name[2:4]}/{name}"
+
+
+def version_key(version: str) -> tuple:
+    """Sort key ordering versions by SemVer precedence (build metadata ignored)."""
+    core, _, pre = version.split('+')[0].partition('-')
+    numbers = tuple(int(part) if part.isdigit() else 0 for part in core.split('.'))
+    if not pre:
+        # A release sorts after all of its prereleases
+        return numbers, 1, ()
+    identifiers = tuple(
+        (0, int(part), "") if part.isdigit() else (1, 0, part)
+        for part in pre.split('.')
+    )
+    return numbers, 0, identifiers
+
+
+def latest_indexed_version(lines) -> str | None:
+    """Pick the newest non-yanked version from sparse index lines as they arrive."""
+    latest = latest_key = None
+    for line in lines:
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        if entry.get("yanked"):
+            continue
+        key = version_key(entry["vers"])
+        if latest_key is None or key > latest_key:
+            latest, latest_key = entry["vers"], key
+    return latest
+
+
+def fetch_latest_version(crate_name: str) -> str | None:
+    """Stream a crate's sparse index file and return its newest version, if any."""
+    path = sparse_index_path(crate_name)
+    headers = {"User-Agent": USER_AGENT}
+
+    # Retry once on a fresh connection if the server dropped the idle one
+    for attempt in range(2):
+        conn = getattr(thread_state, "connection", None)
+        if conn is None:
+            conn = http.client.HTTPSConnection(SPARSE_INDEX_HOST, timeout=30)
+            thread_state.connection = conn
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            if response.status == 200:
+                # Fold versions line by line instead of buffering the whole file
+                return latest_indexed_version(response)
+            # Drain the body so the connection can be reused
+            response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            thread_state.connection = None
+            if attempt:
+                raise
+            continue
+
+        if response.status in (403, 404, 410):
+            return None
+        raise http.client.HTTPException(f"HTTP {response.status} for {path}")
+
 
 def get_latest_version(crate_name: str) -> tuple[str | None, bool]:
     """
@@ -16,24 +123,46 @@ def get_latest_version(crate_name: str) -> tuple[str | None, bool]:
     Returns: (version, is_prerelease)
     """
     try:
-        result = subprocess.run(
-            ["cargo", "search", crate_name, "--limit", "1"],
-            capture_output=True,
-            text=True,
-            timeout=30,
-        )
-        if result.returncode != 0:
-            return None, False
-
-        # Parse output like: crate_name = "1.2.3"    # description
-        match = re.search(rf'^{re.escape(crate_name)}\s*=\s*"([^"]+)"', result.stdout, re.MULTILINE)
-        if match:
-            version = match.group(1)
-            is_prerelease = any(pre in version.lower() for pre in ['alpha', 'beta', 'rc', '-'])
-            return version, is_prerelease
-    except (subprocess.TimeoutExpired, FileNotFoundError):
+        version = fetch_latest_version(crate_name)
+    except (http.client.HTTPException, OSError, ValueError):
+        return None, False
+    if version is None:
+        return None, False
+
+    is_prerelease = any(pre in version.lower() for pre in ['alpha', 'beta', 'rc', '-'])
+    return version, is_prerelease
+
+
+def load_version_cache() -> dict:
+    """Load the on-disk latest-version cache, or an empty one if it's missing or corrupt."""
+    try:
+        cache = json.loads(CACHE_PATH.read_text())
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def save_version_cache(cache: dict) -> None:
+    """Write the latest-version cache atomically; a failed write only loses the cache."""
+    tmp_path = CACHE_PATH.with_name(f"{CACHE_PATH.name}.{os.getpid()}.tmp")
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps(cache, indent=2, sort_keys=True))
+        os.replace(tmp_path, CACHE_PATH)
+    except OSError as e:
+        print(f"Warning: could not write {CACHE_PATH}: {e}")
+        tmp_path.unlink(missing_ok=True)
+
+
+def cached_latest_version(cache: dict, crate_name: str, now: float) -> tuple[str, bool] | None:
+    """Return a crate's cached (version, is_prerelease) if it is still fresh."""
+    entry = cache.get(crate_name)
+    try:
+        if now - entry["ts"] < CACHE_TTL:
+            return entry["version"], entry["prerelease"]
+    except (KeyError, TypeError):
         pass
-    return None, False
+    return None
 
 
 def version_matches(spec: str, version: str) -> bool:
@@ -49,105 +178,74 @@ def version_matches(spec: str, version: str) -> bool:
     return True
 
 
-def parse_cargo_toml(content: str) -> dict[str, tuple[str, int, int]]:
-    """
-    Parse Cargo.toml and extract dependencies with their line positions.
-    Returns: {crate_name: (current_version, line_start, line_end)}
-    """
-    deps = {}
-    lines = content.split('\n')
-    in_dep_section = False
-
-    for i, line in enumerate(lines):
-        # Check for dependency sections
-        if re.match(r'^\[(dependencies|dev-dependencies|build-dependencies|workspace\.dependencies)\]', line):
-            in_dep_section = True
-            continue
-        elif re.match(r'^\[target\..*\.dependencies\]', line):
-            in_dep_section = True
-            continue
-        elif re.match(r'^\[', line):
-            in_dep_section = False
-            continue
-
-        if not in_dep_section:
-            continue
+def iter_dependency_tables(data: dict):
+    """Yield every dependency table in a parsed Cargo.toml."""
+    for name in DEPENDENCY_TABLES:
+        yield data.get(name, {})
+    yield data.get("workspace", {}).get("dependencies", {})
+    for target in data.get("target", {}).values():
+        for name in DEPENDENCY_TABLES:
+            yield target.get(name, {})
 
-        # Match simple dependency: crate = "version"
-        simple_match = re.match(r'^(\w[\w-]*)\s*=\s*"([^"]+)"', line)
-        if simple_match:
-            crate_name = simple_match.group(1)
-            version = simple_match.group(2)
-            deps[crate_name] = (version, i, i)
-            continue
 
-        # Match table dependency: crate = { version = "x.y.z", ... }
-        table_match = re.match(r'^(\w[\w-]*)\s*=\s*\{.*version\s*=\s*"([^"]+)"', line)
-        if table_match:
-            crate_name = table_match.group(1)
-            version = table_match.group(2)
-            deps[crate_name] = (version, i, i)
-            continue
+def parse_cargo_toml(content: str) -> dict[str, str]:
+    """
+    Parse Cargo.toml and extract dependencies with their version specs.
+    Returns: {crate_name: current_version}
+    Raises tomllib.TOMLDecodeError if the file is not valid TOML.
+    """
+    data = tomllib.loads(content)
 
-        # Match multi-line table dependency
-        table_start = re.match(r'^(\w[\w-]*)\s*=\s*\{\s*$', line)
-        if table_start:
-            crate_name = table_start.group(1)
-            # Look for version in subsequent lines
-            for j in range(i + 1, min(i + 10, len(lines))):
-                if '}' in lines[j]:
-                    break
-                version_match = re.search(r'version\s*=\s*"([^"]+)"', lines[j])
-                if version_match:
-                    deps[crate_name] = (version_match.group(1), i, j)
-                    break
+    versions = {}
+    for table in iter_dependency_tables(data):
+        for crate_name, spec in table.items():
+            if isinstance(spec, dict):
+                spec = spec.get("version")
+            # Path/git dependencies without a version have nothing to update
+            if isinstance(spec, str):
+                versions[crate_name] = spec
 
-    return deps
+    return versions
 
 
 def update_cargo_toml(content: str, updates: dict[str, str]) -> str:
-    """Update Cargo.toml content with new versions."""
+    """Update Cargo.toml content with new versions in a single pass."""
     lines = content.split('\n')
+    in_dep_section = False
+    table_crate = None  # Crate of the current [dependencies.crate] table
 
-    for crate_name, new_version in updates.items():
-        for i, line in enumerate(lines):
-            # Update simple dependency
-            if re.match(rf'^{re.escape(crate_name)}\s*=\s*"[^"]+"', line):
-                lines[i] = re.sub(
-                    rf'^({re.escape(crate_name)}\s*=\s*")[^"]+(")',
-                    rf'\g<1>{new_version}\2',
-                    line
-                )
-                continue
+    for i, line in enumerate(lines):
+        if line.startswith('['):
+            header = DEP_HEADER_RE.match(line)
+            table_crate = header['crate'] if header else None
+            in_dep_section = header is not None and table_crate is None
+            continue
 
-            # Update table dependency version
-            if re.match(rf'^{re.escape(crate_name)}\s*=\s*\{{.*version\s*=\s*"[^"]+"', line):
-                lines[i] = re.sub(
-                    r'(version\s*=\s*")[^"]+(")',
-                    rf'\g<1>{new_version}\2',
-                    line
-                )
+        if table_crate is not None:
+            if table_crate not in updates:
+                continue
+            match = TABLE_VERSION_RE.match(line)
+            if match is None:
                 continue
+            crate_name, group = table_crate, 1
+        elif in_dep_section:
+            match = DEP_VERSION_RE.match(line)
+            if match is None or match.group(1) not in updates:
+                continue
+            crate_name = match.group(1)
+            group = next(g for g in (2, 3, 4) if match.group(g) is not None)
+        else:
+            continue
 
-            # Update multi-line table dependency
-            if re.search(r'version\s*=\s*"[^"]+"', line):
-                # Check if this line is part of the crate's definition
-                for j in range(i - 1, max(i - 10, -1), -1):
-                    if re.match(rf'^{re.escape(crate_name)}\s*=', lines[j]):
-                        lines[i] = re.sub(
-                            r'(version\s*=\s*")[^"]+(")',
-                            rf'\g<1>{new_version}\2',
-                            line
-                        )
-                        break
-                    if re.match(r'^\[', lines[j]) or re.match(r'^\w', lines[j]):
-                        break
+        # Replace only the version string, keeping the rest of the line intact
+        lines[i] = line[:match.start(group)] + updates[crate_name] + line[match.end(group):]
 
     return '\n'.join(lines)
 
 
 def main():
     dry_run = '--dry-run' in sys.argv
+    use_cache = '--no-cache' not in sys.argv
 
     # Find Cargo.toml
     cargo_toml = Path('Cargo.toml')
@@ -156,19 +254,47 @@ def main():
         sys.exit(1)
 
     content = cargo_toml.read_text()
-    deps = parse_cargo_toml(content)
+    try:
+        deps = parse_cargo_toml(content)
+    except tomllib.TOMLDecodeError as e:
+        print(f"Error: Cargo.toml is not valid TOML: {e}")
+        sys.exit(1)
 
     if not deps:
         print("No dependencies found in Cargo.toml")
         return
 
     print(f"Found {len(deps)} dependencies\n")
+
+    # Crates looked up within the last day come from the cache
+    cache = load_version_cache()
+    now = time.time()
+    latest_versions = {}
+    if use_cache:
+        for crate_name in deps:
+            cached = cached_latest_version(cache, crate_name, now)
+            if cached is not None:
+                latest_versions[crate_name] = cached
+
+    # Look up the rest at once instead of one round-trip after another
+    names = sorted(set(deps) - set(latest_versions))
+    if names:
+        with ThreadPoolExecutor(max_workers=MAX_LOOKUPS) as executor:
+            fetched = dict(zip(names, executor.map(get_latest_version, names)))
+        latest_versions.update(fetched)
+
+        # Failed lookups are not cached so the next run retries them
+        for crate_name, (version, is_prerelease) in fetched.items():
+            if version is not None:
+                cache[crate_name] = {"version": version, "prerelease": is_prerelease, "ts": now}
+        save_version_cache(cache)
+
     print(f"{'Crate':<25} {'Current':<15} {'Latest':<15} {'Status'}")
     print("-" * 70)
 
     updates = {}
-    for crate_name, (current_version, _, _) in sorted(deps.items()):
-        latest, is_prerelease = get_latest_version(crate_name)
+    for crate_name, current_version in sorted(deps.items()):
+        latest, is_prerelease = latest_versions[crate_name]
 
         if latest is None:
             status = "[!] Not found"